@@ -26,15 +26,18 @@ FOOTER = r"""
 ### OPTIONAL SETTINGS ###
 #########################
 
-### Maximum number of comments to retrieve.
-RETRIEVAL_LIMIT = 500
-
 ### Maximum number of entries in cache for detected keyword comments
 CACHE_SIZE = 500
 
 ### Comment cache file location
 CACHE_FILE = 'cache/processed_comments'
 
+### Wiktionary definition cache file location
+DEFINITIONS_FILE = 'cache/definitions.json'
+
+### Maximum number of entries in cache for retrieved definitions
+DEFINITIONS_CACHE_SIZE = 4096
+
 ### subreddits to parse; passed into reddit instance.
 # See: https://praw.readthedocs.io/en/latest/code_overview/models/subreddit.html
 SUBREDDITS = 'all-suicidewatch-depression-anxiety'
@@ -6,86 +6,236 @@ Wiktionary definition of the word.
 
 """
 
-from functools import lru_cache
-import re
+from collections import OrderedDict
+import json
 from time import sleep
-import urllib
-from bs4 import BeautifulSoup
 from praw.exceptions import APIException
+import requests
+from selectolax.lexbor import LexborHTMLParser
 from reddit_bot import RedditBot
-from config import FOOTER
+from config import DEFINITIONS_CACHE_SIZE, DEFINITIONS_FILE, FOOTER
+
+# Shared session so Wiktionary connections are kept alive between lookups.
+# Compressed responses are decoded transparently by requests.
+SESSION = requests.Session()
+SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Linux x86_64)',
+    'Accept-Encoding': 'gzip',
+    })
+
+# Definitions persisted between runs, least recently used first;
+# words without an entry map to None
+DEFINITIONS = OrderedDict()
 
 class FiniteDinoBot(RedditBot):
     """FiniteDinoBot"""
 
     DEFINE_URL = 'https://en.wiktionary.org/wiki/'
-    BOLD = re.compile(r'<\/?(b|strong)[^>]*>', re.I|re.M)
-    ITALICS = re.compile(r'<\/?(i|em)[^>]*>', re.I|re.M)
-    CITATIONS = re.compile(r'(&#91;|\[)[\s\S]*?(&#93;|\])', re.M)
-    EXAMPLES = re.compile(r'<ul>[\s\S]*?</ul>', re.I|re.M)
-    HTML_TAGS = re.compile(r'<\/?[^>]+>', re.I|re.M)
+    WORD_CLASSES = (
+        'span#Noun, span#Pronoun, span#Verb, span#Adjective, span#Adverb, '
+        'span#Conjunction, span#Preposition, span#Interjection'
+        )
+    STYLE_MARKUP = {'b': '**', 'strong': '**', 'i': '_', 'em': '_'}
+    LINE_MARKUP = {'li': '1. ', 'dd': '  '}
 
     def __init__(self):
         super().__init__()
 
     @staticmethod
-    @lru_cache(maxsize=32)
     def retrieve_definition(query):
         """Retrieve and extract first set of word definitions.
+        Results are recorded in DEFINITIONS, including words not found.
 
         Returns
         -------
         dict
             defintion, query_url, word_class, word
         """
+        if query in DEFINITIONS:
+            DEFINITIONS.move_to_end(query)
+            return DEFINITIONS[query]
+
         print('Looking up "{}"...'.format(query))
 
         query_url = FiniteDinoBot.DEFINE_URL + query.replace(' ', '_')
 
-        url_request = urllib.request.Request(
-            query_url,
-            headers={'User-Agent': (
-                'Mozilla/5.0 (Linux x86_64)'
-                )}
-            )
-
         try:
-            with urllib.request.urlopen(url_request) as response:
-                html = response.read()
-        except urllib.error.HTTPError as error:
+            html = FiniteDinoBot.fetch_html(query_url)
+        except requests.RequestException as error:
             print(error)
-            print("Query not found.")
+            print("Unable to retrieve query.")
+            if (error.response is not None
+                    and error.response.status_code == 404):
+                print("Query not found.")
+                FiniteDinoBot.cache_definition(query, None)
             return None
 
-        soup = BeautifulSoup(html, 'html.parser')
+        return FiniteDinoBot.cache_definition(
+            query, FiniteDinoBot.parse_definition(html, query_url)
+            )
 
-        try:
-            raw_definition = soup.find(
-                'span',
-                attrs={'id': [
-                    'Noun', 'Pronoun', 'Verb', 'Adjective', 'Adverb',
-                    'Conjunction', 'Preposition', 'Interjection'
-                    ]},
-                )
-            print("Definition found.")
-            return {
-                'definition': str(raw_definition.find_next('ol')),
-                'query_url': query_url,
-                'word_class': raw_definition.get_text(),
-                'word': str(raw_definition.find_next('p')),
-                }
-        except AttributeError as error:
+    @staticmethod
+    def cache_definition(query, definition):
+        """Records definition in DEFINITIONS.
+        Evicts the least recently used entry once config.DEFINITIONS_CACHE_SIZE
+        is exceeded.
+
+        Parameters
+        ----------
+        query : str
+            Requested word.
+        definition : dict or None
+            Retrieved definition, or None if not found.
+
+        Returns
+        -------
+        dict or None
+            definition
+
+        """
+        DEFINITIONS[query] = definition
+        DEFINITIONS.move_to_end(query)
+        if len(DEFINITIONS) > DEFINITIONS_CACHE_SIZE:
+            DEFINITIONS.popitem(last=False)
+        return definition
+
+    @staticmethod
+    def fetch_html(query_url):
+        """Retrieve rendered content of Wiktionary page.
+
+        Parameters
+        ----------
+        query_url : str
+            Wiktionary page URL.
+
+        Returns
+        -------
+        bytes
+            Article HTML.
+
+        Raises
+        ------
+        requests.RequestException
+            If the page could not be retrieved.
+
+        """
+        # action=render returns only the article body, without site chrome
+        response = SESSION.get(
+            query_url, params={'action': 'render'}, timeout=10
+            )
+        response.raise_for_status()
+        return response.content
+
+    @staticmethod
+    def parse_definition(html, query_url):
+        """Extract first set of word definitions from Wiktionary page.
+
+        Parameters
+        ----------
+        html : bytes
+            Page HTML.
+        query_url : str
+            Wiktionary page URL.
+
+        Returns
+        -------
+        dict or None
+            defintion, query_url, word_class, word in Reddit markup
+            None if no valid definition is found.
+
+        """
+        tree = LexborHTMLParser(html)
+        raw_definition = tree.css_first(FiniteDinoBot.WORD_CLASSES)
+        if raw_definition is None:
             print('Error: No valid definition detected.')
             return None
 
+        definition = FiniteDinoBot.find_next(raw_definition, 'ol')
+        word = FiniteDinoBot.find_next(raw_definition, 'p')
+        if definition is None or word is None:
+            print('Error: No valid definition detected.')
+            return None
+
+        print("Definition found.")
+        return {
+            'definition': FiniteDinoBot.to_markdown(definition),
+            'query_url': query_url,
+            'word_class': raw_definition.text(),
+            'word': FiniteDinoBot.to_markdown(word),
+            }
+
+    @staticmethod
+    def find_next(node, tag):
+        """Finds the first tag element following node in document order.
+
+        Parameters
+        ----------
+        node : selectolax.lexbor.LexborNode
+            Node to search after.
+        tag : str
+            Tag name of element to find.
+
+        Returns
+        -------
+        selectolax.lexbor.LexborNode or None
+            First matching element, or None if there is none.
+
+        """
+        while node is not None:
+            sibling = node.next
+            while sibling is not None:
+                if sibling.tag == tag:
+                    return sibling
+                if sibling.tag != '-text':
+                    descendant = sibling.css_first(tag)
+                    if descendant is not None:
+                        return descendant
+                sibling = sibling.next
+            node = node.parent
+        return None
+
+    @staticmethod
+    def to_markdown(node):
+        """Converts node and its descendants into Reddit markup.
+        Examples and citations are skipped.
+
+        Parameters
+        ----------
+        node : selectolax.lexbor.LexborNode
+            Node to convert.
+
+        Returns
+        -------
+        str
+            Text of node in Reddit markup.
+
+        """
+        if node.tag == '-text':
+            return node.text(deep=False)
+        if node.tag == 'ul' or (
+                node.tag == 'sup'
+                and 'reference' in (node.attributes.get('class') or '').split()
+            ):
+            return ''
+        text = ''.join(
+            FiniteDinoBot.to_markdown(child)
+            for child in node.iter(include_text=True)
+            )
+        if node.tag in FiniteDinoBot.STYLE_MARKUP:
+            mark = FiniteDinoBot.STYLE_MARKUP[node.tag]
+            return mark + text + mark
+        if node.tag in FiniteDinoBot.LINE_MARKUP:
+            return FiniteDinoBot.LINE_MARKUP[node.tag] + text + '\n'
+        return text
+
     @staticmethod
     def format_definition_reply(data):
-        """Formats definiton into Reddit markup.
+        """Formats definiton into Reddit reply.
 
         Parameters
         ----------
         data : dict
-            defintion, query_url, word_class, word
+            defintion, query_url, word_class, word in Reddit markup
 
         Returns
         -------
@@ -95,30 +245,77 @@ class FiniteDinoBot(RedditBot):
         """
         print('Formatting reply to query...')
 
-        for key in ('word', 'word_class', 'definition'):
-            data[key] = FiniteDinoBot.BOLD.sub('**', data[key])
-            data[key] = FiniteDinoBot.ITALICS.sub('_', data[key])
-        data['definition'] = FiniteDinoBot.EXAMPLES.sub('', data['definition'])
-        data['definition'] = (
-            data['definition'].replace('<li>', '1. ').replace('</li>', '\n')
-            )
-        data['definition'] = (
-            data['definition'].replace('<dd>', '  ').replace('</dd>', '\n')
-            )
-        data['definition'] = FiniteDinoBot.CITATIONS.sub('', data['definition'])
-        for key in ('word', 'word_class', 'definition'):
-            data[key] = FiniteDinoBot.HTML_TAGS.sub('', data[key])
+        return ''.join((
+            '#### ', data['word'], '\n',
+            '*', data['word_class'], '*\n\n',
+            data['definition'],
+            '\n[^*Wiktionary*](', data['query_url'], ')',
+            FOOTER,
+            ))
+
+    @staticmethod
+    def read_definitions(file):
+        """Opens and reads JSON file of previously retrieved definitions.
+
+        Parameters
+        ----------
+        file : str
+            Location of definitions cache file.
+
+        Returns
+        -------
+        collections.OrderedDict
+            Query mapped to retrieved definition, or None if not found.
+            Limited to config.DEFINITIONS_CACHE_SIZE most recent entries.
+
+        """
+        try:
+            print("Loading definitions cache into memory...")
+            with open(file, 'r') as data:
+                definitions = json.load(data, object_pairs_hook=OrderedDict)
+            while len(definitions) > DEFINITIONS_CACHE_SIZE:
+                definitions.popitem(last=False)
+            print("Definitions cache loaded.")
+        except FileNotFoundError:
+            print("Definitions cache file not found.")
+            definitions = OrderedDict()
+        except ValueError as error:
+            print(error)
+            print("Unable to read definitions cache file.")
+            definitions = OrderedDict()
+        return definitions
+
+    @staticmethod
+    def write_definitions(file, definitions):
+        """Writes definitions into JSON file.
+        Overwrites original definitions cache file.
+
+        Parameters
+        ----------
+        file : str
+            Location of definitions cache file.
+        definitions : dict
+            Query mapped to retrieved definition, or None if not found.
+
+        """
+        try:
+            print("Saving definitions into cache file...")
+            with open(file, 'w') as cache_file:
+                json.dump(definitions, cache_file)
+            print("Definitions cache saved")
+        except IOError as error:
+            print(error)
+            print("Unable to create definitions cache file")
 
-        reply = '#### {}\n'.format(data['word'])
-        reply += '*{}*\n\n'.format(data['word_class'])
-        reply += data['definition']
-        reply += '\n[^*Wiktionary*]({})'.format(data['query_url'])
-        reply += FOOTER
-        return reply
+    def bot_exit(self, *args, **kwargs):
+        """Saves retrieved definitions before stopping the bot."""
+        self.write_definitions(DEFINITIONS_FILE, DEFINITIONS)
+        super().bot_exit(*args, **kwargs)
 
 def main():
     """Main bot routine"""
     bot = FiniteDinoBot()
+    DEFINITIONS.update(bot.read_definitions(DEFINITIONS_FILE))
     bot.authenticate()
 
     while True:
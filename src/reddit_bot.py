@@ -8,7 +8,7 @@ Allows bot authors to concentrate on writing their custom bot functions.
 
 """
 
-from collections import deque
+from collections import OrderedDict
 from os import mkdir
 import re
 import signal
@@ -19,11 +19,13 @@ from config import (
     CACHE_FILE,
     CACHE_SIZE,
     KEYWORD,
-    RETRIEVAL_LIMIT,
     SITE_NAME,
     SUBREDDITS,
     )
 
+KEYWORD_PATTERN = r' ([ \w]+)'
+DEFAULT_KEYWORD_RE = re.compile(re.escape(KEYWORD) + KEYWORD_PATTERN, re.I)
+
 class RedditBot:
     """Superclass for Reddit bots which adds common bot routines.
 
@@ -37,11 +39,6 @@ class RedditBot:
     keyword : str, optional
         Comment trigger word.
         Defaults to config.KEYWORD.
-    retrieval_limit : int, optional
-        Maximum number of comments to retrieve at a time.
-        Defaults to config.RETRIEVAL_LIMIT.
-        See: https://praw.readthedocs.io/en/latest/code_overview/models
-             /subreddit.html#praw.models.Subreddit.comments
     subreddits : str, optional
         Subreddits to retrieve comments from.
         Defaults to config.SUBREDDITS.
@@ -50,21 +47,28 @@ class RedditBot:
 
     """
 
+    # SIGINT handler is installed once per process, by the first bot
+    sigint_installed = False
+
     def __init__(self,
                  site_name=SITE_NAME,
                  keyword=KEYWORD,
-                 retrieval_limit=RETRIEVAL_LIMIT,
                  subreddits=SUBREDDITS,
                 ):
         print("Initializing bot...")
-        self.keyword = re.compile(keyword+r' ([ \w]+)', re.I)
+        self.keyword = (
+            DEFAULT_KEYWORD_RE if keyword == KEYWORD
+            else re.compile(re.escape(keyword) + KEYWORD_PATTERN, re.I)
+            )
         self.reddit = None
-        self.retrieval_limit = retrieval_limit
+        self.comment_stream = None
         self.site_name = site_name
         self.subreddits = subreddits
         self.username = site_name
         self.processed_comments = self.read_cache(CACHE_FILE)
-        signal.signal(signal.SIGINT, self.bot_exit)
+        if not RedditBot.sigint_installed:
+            signal.signal(signal.SIGINT, self.bot_exit)
+            RedditBot.sigint_installed = True
 
     def authenticate(self, max_attempts=-1, seconds_between_attempts=60):
         """Authenticates SITE_NAME with Reddit.
@@ -99,39 +103,75 @@ class RedditBot:
 
 
     def retrieve_comments(self):
-        """Retrieves comments from subreddits, filters for keyword trigger, and
-        excludes processed comments.
+        """Retrieves new comments from subreddits, filters for keyword trigger,
+        and excludes processed comments.
+        Stops once no new comments are available.
 
         Returns
         -------
         generator
             Dict of reddit.Comment and query.
 
+        See: https://praw.readthedocs.io/en/latest/code_overview/other
+             /subredditstream.html#praw.models.reddit.subreddit.SubredditStream
+
         """
         try:
-            print("Retrieving {} comments...".format(self.retrieval_limit))
-            comments = self.reddit.subreddit(self.subreddits).comments(
-                limit=self.retrieval_limit
-                )
-            for comment in comments:
-                if (comment.author != self.username
-                        and comment not in self.processed_comments
+            if self.comment_stream is None:
+                print("Streaming comments from {}...".format(self.subreddits))
+                self.comment_stream = (
+                    self.reddit.subreddit(self.subreddits)
+                    .stream.comments(pause_after=0)
+                    )
+            for comment in self.comment_stream:
+                if comment is None:
+                    break
+                if comment.id in self.processed_comments:
+                    self.mark_processed(comment.id)
+                elif (comment.author != self.username
                         #and not self.has_already_replied(comment)
                         #and not self.is_summon_chain(comment)
                    ):
-                    query = self.keyword.search(comment.body.lower())
+                    query = self.keyword.search(comment.body)
                     if query:
-                        self.processed_comments.append(comment.id)
-                        yield {'comment': comment, 'query' : query.group(1)}
+                        self.mark_processed(comment.id)
+                        yield {
+                            'comment': comment,
+                            'query' : query.group(1).lower(),
+                            }
         except praw.exceptions.APIException as error:
             print("API Error:", error)
+            # a stream generator cannot be resumed once it has raised
+            self.comment_stream = None
             raise
         except AttributeError as error:
             print(error)
             print("Unable to retrieve comments.")
+            self.comment_stream = None
             raise
 
 
+    def mark_processed(self, comment_id):
+        """Adds comment_id to the processed comments cache, or refreshes it
+        if already present.
+        Evicts the least recently seen comment once config.CACHE_SIZE is
+        exceeded.
+
+        Parameters
+        ----------
+        comment_id : str
+            ID of processed Reddit comment.
+
+        """
+        cache = self.processed_comments
+        if comment_id in cache:
+            cache.move_to_end(comment_id)
+        else:
+            cache[comment_id] = None
+            if len(cache) > CACHE_SIZE:
+                cache.popitem(last=False)
+
+
     def submit_comment(self, target, comment):
         """Submit comment to target submission or comment.
 
@@ -158,7 +198,8 @@ class RedditBot:
 
     @staticmethod
     def read_cache(file):
-        """Opens and reads file, converting contents to \n separated list.
+        """Opens and reads file, converting \n separated contents to ordered
+        keys, least recently seen first.
         Creates cache file if does not exist.
 
         Parameters
@@ -168,15 +209,18 @@ class RedditBot:
 
         Returns
         -------
-        collections.deque
+        collections.OrderedDict
             Contents of cache file, limited to config.CACHE_SIZE
 
         """
         try:
             print("Loading cache file into memory...")
             with open(file, 'r') as data:
-                cache = data.read()
-            mem_cache = deque(cache.split('\n'), CACHE_SIZE)
+                mem_cache = OrderedDict.fromkeys(
+                    line.rstrip('\n') for line in data
+                    )
+            while len(mem_cache) > CACHE_SIZE:
+                mem_cache.popitem(last=False)
             print("Cache loaded.")
         except FileNotFoundError:
             print("Cache file not found.")
@@ -190,12 +234,12 @@ class RedditBot:
             except IOError as error:
                 print(error)
                 print("Unable to create cache file")
-            mem_cache = deque([], CACHE_SIZE)
+            mem_cache = OrderedDict()
         return mem_cache
 
     @staticmethod
     def write_cache(file, mem_cache):
-        """Writes list into file, converting list to \n separated contents.
+        """Writes keys into file, converting them to \n separated contents.
         Overwrites original cache file.
         Creates cache file if does not exist.
 
@@ -203,22 +247,15 @@ class RedditBot:
         ----------
         file : str
             Location of cache file.
-        mem_cache : list or deque
+        mem_cache : iterable
             Items in memory cache
 
         """
         try:
             print("Saving memory into cache file...")
             with open(file, 'w') as cache_file:
-                try:
-                    cache_file.write(mem_cache.popleft())
-                    for entry in mem_cache:
-                        cache_file.write('\n'+entry)
-                    # avoid adding \n to end of file so that we don't get empty
-                    # entries in deque when next loaded
-                    print("Cache saved")
-                except IndexError:
-                    print("No items in cache")
+                cache_file.write('\n'.join(mem_cache))
+            print("Cache saved" if mem_cache else "No items in cache")
         except IOError as error:
             print(error)
             print("Unable to create cache file")
@@ -2,6 +2,7 @@
 """Unittests for finite_dino_bot.py"""
 
 import unittest
+from selectolax.lexbor import LexborHTMLParser
 from finite_dino_bot import FiniteDinoBot
 
 class TestFiniteDinoBot(unittest.TestCase):
@@ -29,5 +30,19 @@ class TestFiniteDinoBot(unittest.TestCase):
         reply to parent comment."""
         pass
 
+    def test_to_markdown(self):
+        """finite_dino_bot.to_markdown should convert a Wiktionary definition
+        list into Reddit markup, skipping examples and citations."""
+        tree = LexborHTMLParser(
+            '<ol><li>(<i>informal</i>) A <b>dinosaur</b>.'
+            '<sup class="reference">[1]</sup>'
+            '<dl><dd>A <em>big</em> dino.</dd></dl>'
+            '<ul><li>quotation</li></ul></li></ol>'
+            )
+        self.assertEqual(
+            self.bot.to_markdown(tree.css_first('ol')),
+            '1. (_informal_) A **dinosaur**.  A _big_ dino.\n\n',
+            )
+
 if __name__ == '__main__':
     unittest.main()
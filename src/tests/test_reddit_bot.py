@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 """Unittests for finite_dino_bot.py"""
 
+from types import SimpleNamespace
 import unittest
+from unittest import mock
 import praw
 import config
 import reddit_bot
@@ -30,7 +32,6 @@ class TestRedditBot(unittest.TestCase):
         bot = reddit_bot.RedditBot(config.SITE_NAME)
         bot.reddit = self.reddit    # to avoid calling API multiple times
         bot.subreddits = TEST_SUBREDDIT
-        bot.retrieval_limit = 10
         comments = bot.retrieve_comments()
         print("### RedditBot.retrieve_comments() ###")
         for index, comment in enumerate(comments):
@@ -43,5 +44,57 @@ class TestRedditBot(unittest.TestCase):
         reply to parent comment."""
         pass
 
+class TestRedditBotCache(unittest.TestCase):
+    """Offline unittests for reddit_bot.RedditBot comment caching"""
+
+    def test_retrieve_comments_skips_processed(self):
+        """RedditBot.retrieve_comments should not yield comments whose ids are
+        already in the processed comments cache."""
+        bot = reddit_bot.RedditBot(config.SITE_NAME)
+        bot.reddit = mock.Mock()
+        bot.reddit.subreddit.return_value.stream.comments.return_value = iter([
+            SimpleNamespace(id='seen01', author='a', body='!define dino'),
+            SimpleNamespace(id='new001', author='b', body='!DEFINE Rex'),
+            None,
+            SimpleNamespace(id='later1', author='c', body='!define ptero'),
+            ])
+        bot.mark_processed('seen01')
+        results = list(bot.retrieve_comments())
+        self.assertEqual([r['comment'].id for r in results], ['new001'])
+        self.assertEqual(results[0]['query'], 'rex')
+        self.assertIn('new001', bot.processed_comments)
+        results = list(bot.retrieve_comments())
+        self.assertEqual([r['comment'].id for r in results], ['later1'])
+
+    def test_retrieve_comments_reopens_failed_stream(self):
+        """RedditBot.retrieve_comments should open a new comment stream after
+        the previous one raised an API error."""
+        def failing_stream():
+            raise praw.exceptions.APIException('RATELIMIT', 'slow down', None)
+            yield   # pylint: disable=unreachable
+        bot = reddit_bot.RedditBot(config.SITE_NAME)
+        bot.reddit = mock.Mock()
+        stream = bot.reddit.subreddit.return_value.stream
+        stream.comments.side_effect = [
+            failing_stream(),
+            iter([SimpleNamespace(id='retry1', author='a', body='!define rex')]),
+            ]
+        with self.assertRaises(praw.exceptions.APIException):
+            list(bot.retrieve_comments())
+        results = list(bot.retrieve_comments())
+        self.assertEqual([r['comment'].id for r in results], ['retry1'])
+
+    def test_mark_processed_evicts_least_recent(self):
+        """RedditBot.mark_processed should evict the least recently seen
+        comment once the cache is full."""
+        bot = reddit_bot.RedditBot(config.SITE_NAME)
+        bot.processed_comments.clear()
+        with mock.patch('reddit_bot.CACHE_SIZE', 2):
+            bot.mark_processed('first1')
+            bot.mark_processed('second')
+            bot.mark_processed('first1')
+            bot.mark_processed('third1')
+        self.assertEqual(list(bot.processed_comments), ['first1', 'third1'])
+
 if __name__ == '__main__':
     unittest.main()